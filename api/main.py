@@ -1,22 +1,31 @@
 import os
 import uuid
-import json
+import time
+import asyncio
+import hashlib
 import httpx
+import orjson
 from datetime import datetime, timedelta, timezone
-from typing import List
+from functools import cache
+from typing import List, Literal
 
+from celery import group
 from fastapi import FastAPI, Depends, HTTPException, status
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 
-from jose import JWTError, jwt
-from pydantic import BaseModel, Field
+import jwt
+from jwt import InvalidTokenError
+from cachetools import TTLCache
+from pydantic import BaseModel, Field, model_validator
+import redis.asyncio as aioredis
 
 import config
 from workers.providers import provider_factory
-from utils.redis_client import redis_client
+from utils.redis_client import REDIS_URL
+from utils.rate_limiter import register_token_bucket
 from utils.schemas import JobStatus
-from workers.tts_worker import process_block
+from workers.tts_worker import process_block, process_block_batch
 
 from utils.logger import logger
 
@@ -34,15 +43,47 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Verified tokens, keyed by a digest of the raw token, so polling clients
+# don't pay a full JWT decode on every request.
+_token_cache = TTLCache(maxsize=10000, ttl=60)
+
+
+# --- Provider Helpers ---
+# The provider set is fixed at import time, so build the list exposed to clients once.
+PROVIDER_NAMES = list(provider_factory.keys())
+# Literal[()] is not a valid type, so with no providers configured any name is accepted
+# here and rejected by TextBlock.check_voice instead.
+ProviderName = Literal[tuple(PROVIDER_NAMES)] if PROVIDER_NAMES else str
+
+
+@cache
+def _voice_ids(provider_name: str) -> frozenset:
+    """Returns the set of voice IDs a provider accepts, computed once per provider."""
+    return frozenset(v["voice_id"] for v in provider_factory[provider_name].get_voices())
+
 
 # --- Models ---
 class TextBlock(BaseModel):
     text: str = Field(..., min_length=1, max_length=1000)
     wait_after_ms: int = Field(0, ge=0)
-    provider: str = Field("elevenlabs", description="The TTS provider to use for this block.")
+    provider: ProviderName = Field(
+        "elevenlabs", validate_default=True, description="The TTS provider to use for this block."
+    )
     voice: str = Field("default", description="The voice to use for this block.")
     arabic: bool = Field(False, description="Set to true to preprocess text for Arabic.")
 
+    @model_validator(mode="after")
+    def check_voice(self):
+        if self.provider not in provider_factory:
+            raise ValueError(f"Provider '{self.provider}' is not available.")
+        if self.voice not in _voice_ids(self.provider):
+            # The sorted voice list is only built on this error path.
+            raise ValueError(
+                f"Invalid voice '{self.voice}' for provider '{self.provider}'. "
+                f"Available voices: {sorted(_voice_ids(self.provider))}"
+            )
+        return self
+
 
 class TTSRequest(BaseModel):
     project_id: str = Field(None, description="The ID of the project this TTS job belongs to.")
@@ -64,19 +105,104 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _token_cache.get(cache_key)
+    if cached is not None and cached[1] > time.time():
+        return {"username": cached[0]}
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise JWTError()
-        return {"username": username}
-    except JWTError:
+        payload = jwt.decode(
+            token, SECRET_KEY, algorithms=[ALGORITHM], options={"require": ["exp", "sub"]}
+        )
+    except InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    _token_cache[cache_key] = (payload["sub"], payload["exp"])
+    return {"username": payload["sub"]}
+
+
+async def rate_limit(current_user: dict = Depends(get_current_user)):
+    """
+    Enforces RATE_LIMIT_PER_MINUTE per user with a token bucket kept in Redis,
+    so the limit holds across all API workers at the cost of one round-trip.
+    """
+    if not config.RATE_LIMIT_PER_MINUTE:
+        return current_user
+
+    allowed = await app.state.rate_limit_script(
+        keys=[f"ratelimit:{current_user['username']}"],
+        args=[time.time(), config.RATE_LIMIT_PER_MINUTE / 60, config.RATE_LIMIT_BURST],
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Try again later.",
+            headers={"Retry-After": str(max(1, round(60 / config.RATE_LIMIT_PER_MINUTE)))},
+        )
+    return current_user
+
+
+# --- Response Helpers ---
+def _accel_redirect(file_name: str, download_name: str) -> Response:
+    """
+    Hands a TEMP_DIR file off to the fronting nginx via X-Accel-Redirect, so the
+    bytes are sent by the proxy (sendfile) instead of streamed through Python.
+    """
+    return Response(
+        headers={
+            "X-Accel-Redirect": f"{config.ACCEL_REDIRECT_PREFIX.rstrip('/')}/{file_name}",
+            "Content-Type": "audio/mpeg",
+            "Content-Disposition": f'attachment; filename="{download_name}"',
+        }
+    )
+
+
+def _file_response(path: str, download_name: str) -> Response:
+    """
+    Serves a TEMP_DIR file directly, stat'ing it once: the result doubles as the
+    existence check and is handed to FileResponse so it doesn't stat again.
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        return JSONResponse(status_code=404, content={"error": "FILE_NOT_FOUND"})
+
+    return FileResponse(path, media_type="audio/mpeg", filename=download_name, stat_result=stat_result)
+
+
+# --- Lifecycle ---
+@app.on_event("startup")
+async def startup():
+    # The API uses its own asyncio pool so Redis I/O never blocks the event
+    # loop; the synchronous client in utils.redis_client is for the workers.
+    app.state.redis = aioredis.from_url(
+        REDIS_URL, max_connections=config.REDIS_MAX_CONNECTIONS, decode_responses=True
+    )
+    app.state.rate_limit_script = register_token_bucket(app.state.redis)
+    for provider_name in provider_factory:
+        try:
+            _voice_ids(provider_name)
+        except Exception as e:
+            # Not fatal: the lookup is retried, uncached, on the first request that needs it.
+            logger.error("Failed to load voices for provider '%s': %s", provider_name, e)
+    # One pooled client for outbound calls (e.g. the diacritizer) so requests
+    # reuse keep-alive connections instead of a fresh TLS handshake each time.
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=32)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await app.state.redis.aclose()
+    await app.state.http.aclose()
+
 
 # --- Routes ---
 @app.get("/health")
@@ -107,7 +233,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 @app.get("/tts/providers", tags=["TTS Discovery"])
 def list_providers(current_user: dict = Depends(get_current_user)):
-    return list(provider_factory.keys())
+    return PROVIDER_NAMES
 
 
 @app.get("/tts/voices/{provider_name}", tags=["TTS Discovery"])
@@ -129,28 +255,26 @@ async def _preprocess_arabic_text(text: str) -> str:
         return text
 
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                config.DIACRITIZER_URL,
-                json={
-                    "text": text,
-                    "max_length": 256,
-                    "num_beams": 4,
-                    "temperature": 0.2,
-                    "do_sample": False
-                },
-                timeout=10.0  # Set a timeout for the request
+        response = await app.state.http.post(
+            config.DIACRITIZER_URL,
+            json={
+                "text": text,
+                "max_length": 256,
+                "num_beams": 4,
+                "temperature": 0.2,
+                "do_sample": False
+            }
+        )
+        response.raise_for_status()  # Raise an exception for bad status codes
+        data = response.json()
+        processed_text = data.get("vocalized_text")
+        if not processed_text:
+            raise HTTPException(
+                status_code=500,
+                detail="Diacritizer API did not return processed text."
             )
-            response.raise_for_status()  # Raise an exception for bad status codes
-            data = response.json()
-            processed_text = data.get("vocalized_text")
-            if not processed_text:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Diacritizer API did not return processed text."
-                )
-            logger.info(f"Successfully diacritized text: {text} -> {processed_text}")
-            return processed_text
+        logger.info(f"Successfully diacritized text: {text} -> {processed_text}")
+        return processed_text
     except httpx.RequestError as e:
         raise HTTPException(
             status_code=503,
@@ -166,7 +290,7 @@ async def _preprocess_arabic_text(text: str) -> str:
 @app.post("/tts", status_code=status.HTTP_202_ACCEPTED, tags=["TTS Generation"])
 async def create_tts_job(
     tts_request: TTSRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(rate_limit)
 ):
     job_id = str(uuid.uuid4())
     
@@ -180,143 +304,130 @@ async def create_tts_job(
 
 
     # --- Preprocessing Step ---
-    processed_blocks = []
-    for block in tts_request.blocks:
-        if block.arabic:
-            processed_text = await _preprocess_arabic_text(block.text)
-            # Create a new block with the processed text, keeping other fields the same
-            new_block = block.copy(update={"text": processed_text})
-            processed_blocks.append(new_block)
-        else:
-            processed_blocks.append(block)
-
-    blocks_data = [block.dict() for block in processed_blocks]
-
-    for block in blocks_data:
-        provider_name = block.get("provider")
-        voice_name = block.get("voice")
-
-        if provider_name not in provider_factory:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid provider '{provider_name}' in block. "
-                       f"Available providers: {list(provider_factory.keys())}"
-            )
-
-        provider = provider_factory[provider_name]
-        available_voices = [v["voice_id"] for v in provider.get_voices()]
-        if voice_name not in available_voices:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid voice '{voice_name}' for provider '{provider_name}'. "
-                       f"Available voices: {available_voices}"
-            )
+    # Diacritize all Arabic blocks concurrently rather than one after another.
+    processed_blocks = list(tts_request.blocks)
+    arabic_indexes = [i for i, block in enumerate(processed_blocks) if block.arabic]
+    processed_texts = await asyncio.gather(
+        *(_preprocess_arabic_text(processed_blocks[i].text) for i in arabic_indexes)
+    )
+    for i, processed_text in zip(arabic_indexes, processed_texts):
+        # Create a new block with the processed text, keeping other fields the same
+        processed_blocks[i] = processed_blocks[i].model_copy(update={"text": processed_text})
 
     job_data = {
         "status": JobStatus.QUEUED,
         "submitted_by": current_user["username"],
         "user_id": tts_request.user_id,
         "submitted_at": datetime.now(timezone.utc).isoformat(),
-        "blocks": json.dumps(blocks_data),
-        "blocks_total": len(blocks_data),
+        "blocks": orjson.dumps([block.model_dump() for block in processed_blocks]),
+        "blocks_total": len(processed_blocks),
         "blocks_done": 0,
-        "block_urls": json.dumps([]),
         "result_url": "",
         "project_id": project_id
     }
 
-    redis_client.hset(f"job:{job_id}", mapping=job_data)
-
-    for i, block in enumerate(blocks_data):
-        process_block.delay(
-            job_id,
-            i,
-            block['text'],
-            block['wait_after_ms'],
-            block['provider'],
-            block['voice']
-        )
+    await app.state.redis.hset(f"job:{job_id}", mapping=job_data)
+
+    block_args = [
+        (i, block.text, block.wait_after_ms, block.provider, block.voice)
+        for i, block in enumerate(processed_blocks)
+    ]
+    # The tasks carry the job-wide fields so recording a block doesn't have to read them back.
+    job_fields = {"blocks_total": len(block_args), "project_id": project_id}
+    # A group publishes every task over a single broker producer.
+    if config.BLOCK_BATCH_SIZE > 1:
+        group(
+            process_block_batch.s(
+                job_id, block_args[start:start + config.BLOCK_BATCH_SIZE], **job_fields
+            )
+            for start in range(0, len(block_args), config.BLOCK_BATCH_SIZE)
+        ).apply_async()
+    else:
+        group(process_block.s(job_id, *args, **job_fields) for args in block_args).apply_async()
 
     return {"job_id": job_id, "status": JobStatus.QUEUED}
 
 
 @app.get("/status/{job_id}", tags=["TTS Generation"])
 async def get_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
-    job_data = redis_client.hgetall(f"job:{job_id}")
-    if not job_data:
+    job_data = await app.state.redis.hmget(
+        f"job:{job_id}", "submitted_by", "status", "blocks_done", "blocks_total", "result_url"
+    )
+    submitted_by, job_status, blocks_done, blocks_total, result_url = job_data
+    if submitted_by is None:
         return JSONResponse(status_code=404, content={"error": "JOB_NOT_FOUND"})
 
-    job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-
-    if job["submitted_by"] != current_user["username"]:
+    if submitted_by != current_user["username"]:
         return JSONResponse(status_code=403, content={"error": "UNAUTHORIZED_ACCESS"})
 
     return {
         "job_id": job_id,
-        "status": job["status"],
-        "progress": f"{job.get('blocks_done', 0)}/{job.get('blocks_total', 0)}",
-        "result_url": job.get("result_url"),
+        "status": job_status,
+        "progress": f"{blocks_done or 0}/{blocks_total or 0}",
+        "result_url": result_url,
     }
 
 
 @app.get("/result/{job_id}", tags=["TTS Generation"])
 async def get_job_result(job_id: str, current_user: dict = Depends(get_current_user)):
-    job_data = redis_client.hgetall(f"job:{job_id}")
-    if not job_data:
+    submitted_by, job_status, result_url = await app.state.redis.hmget(
+        f"job:{job_id}", "submitted_by", "status", "result_url"
+    )
+    if submitted_by is None:
         return JSONResponse(status_code=404, content={"error": "JOB_NOT_FOUND"})
 
-    job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-
-    if job["submitted_by"] != current_user["username"]:
+    if submitted_by != current_user["username"]:
         return JSONResponse(status_code=403, content={"error": "UNAUTHORIZED_ACCESS"})
 
-    if job["status"] != JobStatus.COMPLETED:
-        return JSONResponse(status_code=400, content={"error": f"Job not complete. Status: {job['status']}"})
+    if job_status != JobStatus.COMPLETED:
+        return JSONResponse(status_code=400, content={"error": f"Job not complete. Status: {job_status}"})
+
+    # The block list is the largest read, so only fetch it once the caller is
+    # known to own a completed job.
+    block_urls = await app.state.redis.lrange(f"job:{job_id}:block_urls", 0, -1)
 
     return {
         "job_id": job_id,
-        "result_url": job["result_url"],
-        "block_urls": json.loads(job["block_urls"])
+        "result_url": result_url,
+        "block_urls": [orjson.loads(entry) for entry in block_urls]
     }
 
 
 @app.get("/result/{job_id}/block/{block_index}/audio", tags=["TTS Generation"])
 async def get_block_audio(job_id: str, block_index: int, current_user: dict = Depends(get_current_user)):
-    job_data = redis_client.hgetall(f"job:{job_id}")
-    if not job_data:
+    submitted_by, job_status = await app.state.redis.hmget(f"job:{job_id}", "submitted_by", "status")
+    if submitted_by is None:
         return JSONResponse(status_code=404, content={"error": "JOB_NOT_FOUND"})
 
-    job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-
-    if job["submitted_by"] != current_user["username"]:
+    if submitted_by != current_user["username"]:
         return JSONResponse(status_code=403, content={"error": "UNAUTHORIZED_ACCESS"})
 
-    if job["status"] != JobStatus.COMPLETED:
-        return JSONResponse(status_code=400, content={"error": f"Job not complete. Status: {job['status']}"})
+    if job_status != JobStatus.COMPLETED:
+        return JSONResponse(status_code=400, content={"error": f"Job not complete. Status: {job_status}"})
 
-    block_path = os.path.join(TEMP_DIR, f"{job_id}_dl_block{block_index}.mp3")
-    if not os.path.exists(block_path):
-        return JSONResponse(status_code=404, content={"error": "FILE_NOT_FOUND"})
+    if config.ACCEL_REDIRECT_PREFIX:
+        # nginx answers the 404 itself if the file is gone.
+        return _accel_redirect(f"{job_id}_dl_block{block_index}.mp3", f"block_{block_index}.mp3")
 
-    return FileResponse(block_path, media_type="audio/mpeg", filename=f"block_{block_index}.mp3")
+    return _file_response(
+        os.path.join(TEMP_DIR, f"{job_id}_dl_block{block_index}.mp3"), f"block_{block_index}.mp3"
+    )
 
 
 @app.get("/result/{job_id}/audio", tags=["TTS Generation"])
 async def get_job_audio(job_id: str, current_user: dict = Depends(get_current_user)):
-    job_data = redis_client.hgetall(f"job:{job_id}")
-    if not job_data:
+    submitted_by, job_status = await app.state.redis.hmget(f"job:{job_id}", "submitted_by", "status")
+    if submitted_by is None:
         return JSONResponse(status_code=404, content={"error": "JOB_NOT_FOUND"})
 
-    job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-
-    if job["submitted_by"] != current_user["username"]:
+    if submitted_by != current_user["username"]:
         return JSONResponse(status_code=403, content={"error": "UNAUTHORIZED_ACCESS"})
 
-    if job["status"] != JobStatus.COMPLETED:
-        return JSONResponse(status_code=400, content={"error": f"Job not complete. Status: {job['status']}"})
+    if job_status != JobStatus.COMPLETED:
+        return JSONResponse(status_code=400, content={"error": f"Job not complete. Status: {job_status}"})
 
-    final_path = os.path.join(TEMP_DIR, f"{job_id}_final.mp3")
-    if not os.path.exists(final_path):
-        return JSONResponse(status_code=404, content={"error": "FILE_NOT_FOUND"})
+    if config.ACCEL_REDIRECT_PREFIX:
+        # nginx answers the 404 itself if the file is gone.
+        return _accel_redirect(f"{job_id}_final.mp3", "final_audio.mp3")
 
-    return FileResponse(final_path, media_type="audio/mpeg", filename="final_audio.mp3")
\ No newline at end of file
+    return _file_response(os.path.join(TEMP_DIR, f"{job_id}_final.mp3"), "final_audio.mp3")
\ No newline at end of file
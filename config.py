@@ -18,10 +18,31 @@ def get_boolean_flag(key: str, default: bool = False) -> bool:
 STORAGE_BACKEND = get_config("storage_backend", "cloudinary")
 STORAGE_MIRRORING = get_boolean_flag("storage_mirroring", default=False)
 GRAPHQL_ENABLED = get_boolean_flag("graphql_enabled", default=False)
+GRAPHQL_PERSISTED_QUERIES = get_boolean_flag("graphql_persisted_queries", default=False)
+# Upper bound on provider uploads in flight per process, primary and mirror combined.
+STORAGE_MAX_CONCURRENCY = int(get_config("STORAGE_MAX_CONCURRENCY", 12))
+# Tighter cap for Cloudinary alone, which answers bursts of parallel uploads with 429s.
+CLOUDINARY_MAX_CONCURRENCY = int(get_config("CLOUDINARY_MAX_CONCURRENCY", 6))
 
 # --- Service URLs and Keys ---
 
 DIACRITIZER_URL = get_config("DIACRITIZER_URL")
+REDIS_MAX_CONNECTIONS = int(get_config("REDIS_MAX_CONNECTIONS", 50))
+# When set (e.g. "/_protected/"), audio downloads are delegated to nginx via X-Accel-Redirect.
+ACCEL_REDIRECT_PREFIX = get_config("ACCEL_REDIRECT_PREFIX")
+# Per-user job submissions allowed per minute, shared across API workers through Redis (0 disables).
+RATE_LIMIT_PER_MINUTE = int(get_config("RATE_LIMIT_PER_MINUTE", 0))
+RATE_LIMIT_BURST = int(get_config("RATE_LIMIT_BURST", RATE_LIMIT_PER_MINUTE))
+# Greenlets per worker process. Block tasks are almost entirely network I/O, so
+# this can be far higher than the CPU count the gevent pool defaults to.
+WORKER_CONCURRENCY = int(get_config("WORKER_CONCURRENCY", 64))
+# Join MP3 blocks by copying their frames instead of decoding them. Faster, but every block keeps
+# its encoder delay and padding, which lengthens each join by tens of ms.
+MP3_STREAM_COPY = get_boolean_flag("mp3_stream_copy", default=False)
+# How long a job's block and final files stay in the worker's temp dir after it is combined.
+TEMP_RETENTION_SECONDS = int(get_config("TEMP_RETENTION_SECONDS", 3600))
+# Blocks sent to the workers per task message. 1 keeps one task per block.
+BLOCK_BATCH_SIZE = int(get_config("BLOCK_BATCH_SIZE", 1))
 
 # --- TTS Provider Configurations ---
 
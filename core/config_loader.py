@@ -1,8 +1,17 @@
 import os
 import yaml
 from dotenv import load_dotenv
+from functools import lru_cache
 from typing import Any, Dict
 
+# Prefer the libyaml-backed loader; fall back to the pure-Python one if PyYAML
+# was built without the C extension.
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+@lru_cache(maxsize=1)
 def load_raw_config() -> Dict[str, Any]:
     """
     Loads configuration from a YAML file and .env, then merges them.
@@ -17,7 +26,7 @@ def load_raw_config() -> Dict[str, Any]:
     # 1. Load base configuration from config.yaml (optional)
     try:
         with open("config.yaml", "r") as f:
-            yaml_config = yaml.safe_load(f)
+            yaml_config = yaml.load(f, Loader=SafeLoader)
             if isinstance(yaml_config, dict):
                 # Store YAML config with lowercase keys
                 config.update({k.lower(): v for k, v in yaml_config.items()})
@@ -28,8 +37,7 @@ def load_raw_config() -> Dict[str, Any]:
         print(f"Warning: Could not parse config.yaml. Error: {e}")
 
     # 2. Load and override with environment variables
-    for key, value in os.environ.items():
-        config[key.lower()] = value
+    config.update({key.lower(): value for key, value in os.environ.items()})
 
     return config
 
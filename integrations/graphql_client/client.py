@@ -1,10 +1,12 @@
 import httpx
 import uuid
+import hashlib
 from urllib.parse import urlparse
 from utils.schemas import JobStatus
 from tenacity import retry, stop_after_attempt, wait_exponential, RetryError, after_log, retry_if_exception_type
 from utils.logger import logger
 from core.config_loader import raw_config
+from config import GRAPHQL_PERSISTED_QUERIES
 from datetime import datetime, timezone
 
 # A simple logger for tenacity to show retry attempts
@@ -49,6 +51,18 @@ class GraphQLClientAdapter:
     }
     """
 
+    INSERT_BLOCKS_BULK_MUTATION = """
+    mutation InsertBlocksBulk($rows: [Voice_Studio_blocks_insert_input!]!) {
+      insert_Voice_Studio_blocks(objects: $rows) {
+        affected_rows
+        returning {
+          id
+          block_index
+        }
+      }
+    }
+    """
+
     INSERT_VOICE_LINKS_MUTATION = """
     mutation InsertVioceLinks($block_id: uuid, $link_url: String) {
         insert_Voice_Studio_vioce_links(objects: {block_id: $block_id, link_url: $link_url}) {
@@ -73,36 +87,79 @@ class GraphQLClientAdapter:
             "x-hasura-admin-secret": admin_secret,
             "Content-Type": "application/json",
         }
-        self.client = httpx.Client(headers=self.headers, timeout=10.0)
+        # HTTP/2 lets concurrent worker mutations share one TLS connection to Hasura.
+        self.client = httpx.Client(
+            headers=self.headers,
+            timeout=10.0,
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=128, keepalive_expiry=30.0)
+        )
         self.max_retries = int(raw_config.get("task_max_retries", 3))
         self.retry_delay = int(raw_config.get("task_retry_delay_seconds", 60))
+        # Build the retry policy once with the configured values instead of on every mutation.
+        self._post = retry(
+            wait=wait_exponential(multiplier=1, min=2, max=self.retry_delay),
+            stop=stop_after_attempt(self.max_retries),
+            retry=retry_if_exception_type(httpx.RequestError),
+            after=after_log(log, logging.INFO)
+        )(self._raw_post)
+        # Automatic persisted queries: send only the document hash and fall back to
+        # the full text the first time the server hasn't seen it.
+        self.persisted_queries = GRAPHQL_PERSISTED_QUERIES
+        self._hashes = {
+            mutation: hashlib.sha256(mutation.encode("utf-8")).hexdigest()
+            for mutation in (
+                self.CREATE_PROJECT_MUTATION,
+                self.LINK_PROJECT_STORAGE_MUTATION,
+                self.INSERT_BLOCKS_MUTATION,
+                self.INSERT_BLOCKS_BULK_MUTATION,
+                self.INSERT_VOICE_LINKS_MUTATION,
+            )
+        }
         logger.info("GraphQLClientAdapter initialized successfully with retry policy.")
 
+    def _raw_post(self, mutation: str, variables: dict):
+        """
+        Sends a single GraphQL mutation and returns the decoded response.
+        """
+        if self.persisted_queries:
+            extensions = {"persistedQuery": {"version": 1, "sha256Hash": self._hashes[mutation]}}
+            data = self._send({"extensions": extensions, "variables": variables})
+            if self._persisted_query_not_found(data):
+                data = self._send({"query": mutation, "extensions": extensions, "variables": variables})
+        else:
+            data = self._send({"query": mutation, "variables": variables})
+
+        if "errors" in data:
+            # Raise an exception to allow tenacity to catch it and possibly retry
+            raise Exception("Hasura error: " + str(data["errors"]))
+        return data
+
+    def _send(self, payload: dict) -> dict:
+        """
+        Posts a raw GraphQL payload and returns the decoded JSON body.
+        """
+        response = self.client.post(self.endpoint, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _persisted_query_not_found(data: dict) -> bool:
+        """
+        Checks whether the server rejected a hash-only request because it doesn't know the document yet.
+        """
+        return any(
+            error.get("message") == "PersistedQueryNotFound"
+            or error.get("extensions", {}).get("code") == "PERSISTED_QUERY_NOT_FOUND"
+            for error in data.get("errors", ())
+        )
+
     def _execute_mutation_with_retry(self, mutation: str, variables: dict):
         """
         Helper function that wraps the GraphQL mutation call with a retry policy.
         """
         try:
-            # Define the retry decorator dynamically with configured values
-            retry_decorator = retry(
-                wait=wait_exponential(multiplier=1, min=2, max=self.retry_delay),
-                stop=stop_after_attempt(self.max_retries),
-                retry=retry_if_exception_type(httpx.RequestError),
-                after=after_log(log, logging.INFO)
-            )
-            
-            @retry_decorator
-            def decorated_mutation():
-                payload = {"query": mutation, "variables": variables}
-                response = self.client.post(self.endpoint, json=payload)
-                response.raise_for_status()
-                data = response.json()
-                if "errors" in data:
-                    # Raise an exception to allow tenacity to catch it and possibly retry
-                    raise Exception("Hasura error: " + str(data["errors"]))
-                return data
-
-            return decorated_mutation()
+            return self._post(mutation, variables)
 
         except RetryError as e:
             # This block is executed after all retries have failed
@@ -179,4 +236,15 @@ class GraphQLClientAdapter:
             "block_id": block_id,
             "link_url": link_url,
         }
-        self._execute_mutation_with_retry(self.INSERT_VOICE_LINKS_MUTATION, variables)
\ No newline at end of file
+        self._execute_mutation_with_retry(self.INSERT_VOICE_LINKS_MUTATION, variables)
+
+    def insert_blocks_bulk(self, rows: list):
+        """
+        Inserts several blocks into the Voice_Studio_Blocks table with a single mutation.
+        Each row carries the same fields as insert_blocks.
+        """
+        if not self.client:
+            logger.warning("GraphQL client is not initialized. Skipping mutation.")
+            return
+
+        return self._execute_mutation_with_retry(self.INSERT_BLOCKS_BULK_MUTATION, {"rows": rows})
\ No newline at end of file
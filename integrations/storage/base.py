@@ -1,4 +1,14 @@
 from abc import ABC, abstractmethod
+from collections import namedtuple
+from collections.abc import Callable
+
+from utils.redis_client import redis_client
+
+# Cached signed URLs stop being handed out this long before they actually expire.
+SIGNED_URL_SAFETY_MARGIN_SECONDS = 300
+
+# The URLs returned by StorageManager.upload. secondary_url is None unless mirroring succeeded.
+UploadResult = namedtuple("UploadResult", ["primary_url", "secondary_url"])
 
 class StorageAdapter(ABC):
     """
@@ -6,14 +16,24 @@ class StorageAdapter(ABC):
     This defines the contract that all storage implementations must follow.
     """
 
+    # Empty so subclasses that declare __slots__ get no per-instance __dict__.
+    __slots__ = ()
+
+    # An optional semaphore capping this provider's own concurrent uploads. StorageManager
+    # takes it before a shared upload slot, so uploads queued on one provider never hold
+    # slots another provider could use.
+    upload_slots = None
+
     @abstractmethod
-    def upload(self, file_path: str, resource_type: str = "raw") -> str:
+    def upload(self, file_path: str, resource_type: str = "raw", data: bytes | None = None) -> str:
         """
         Uploads a file to the storage provider.
 
         Args:
             file_path (str): The local path to the file to upload.
             resource_type (str): The type of resource being uploaded (e.g., 'raw', 'image').
+            data (bytes): The file contents, if already in memory. The file is then not read
+                          from disk and file_path is only used to name the upload.
 
         Returns:
             str: The public URL of the uploaded file.
@@ -31,14 +51,39 @@ class StorageAdapter(ABC):
         pass
 
     @abstractmethod
-    def get_signed_url(self, file_key: str) -> str:
+    def get_signed_url(self, file_key: str, expires_in: int = 3600) -> str:
         """
         Generates a temporary, signed URL for private access to a file.
 
         Args:
             file_key (str): The unique identifier or key of the file in storage.
+            expires_in (int): How long the URL stays valid, in seconds.
 
         Returns:
             str: A temporary signed URL.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def _cached_signed_url(self, cache_key: str, expires_in: int, sign: Callable[[], str]) -> str:
+        """
+        Returns a signed URL from the Redis cache, calling `sign` to generate and cache
+        it on a miss. Repeat requests skip the signing work and get a stable URL that
+        downstream caches can hit.
+
+        Args:
+            cache_key (str): The Redis key to cache the URL under.
+            expires_in (int): The lifetime of the signed URL, in seconds.
+            sign (Callable[[], str]): Generates a fresh signed URL.
+
+        Returns:
+            str: A signed URL that is valid for at least the safety margin.
+        """
+        cached_url = redis_client.get(cache_key)
+        if cached_url:
+            return cached_url
+
+        url = sign()
+        cache_ttl = expires_in - SIGNED_URL_SAFETY_MARGIN_SECONDS
+        if cache_ttl > 0:
+            redis_client.set(cache_key, url, ex=cache_ttl)
+        return url
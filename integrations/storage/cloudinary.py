@@ -1,32 +1,55 @@
+import io
+import os
+import threading
+import cloudinary
+import cloudinary.uploader
 from cloudinary.uploader import upload as cloudinary_upload
-from cloudinary.utils import cloudinary_url
+from cloudinary.utils import cloudinary_url, get_http_connector
+from config import CLOUDINARY_MAX_CONCURRENCY
 from .base import StorageAdapter
 from utils.logger import logger
 
+# The SDK's pool keeps one idle connection per host, so concurrent uploads throw theirs away
+# and each pays a new TLS handshake. Keep one per upload slot so they are reused across blocks.
+cloudinary.uploader._http = get_http_connector(
+    cloudinary.config(), {**cloudinary.CERT_KWARGS, "maxsize": CLOUDINARY_MAX_CONCURRENCY}
+)
+
 class CloudinaryAdapter(StorageAdapter):
     """
     Storage adapter for Cloudinary.
     This class wraps the Cloudinary API for uploading and managing files.
     """
 
-    def upload(self, file_path: str, resource_type: str = "raw") -> str:
+    __slots__ = ()
+
+    # Uploads in flight to Cloudinary from this process; past this they queue instead of being rate-limited.
+    upload_slots = threading.BoundedSemaphore(CLOUDINARY_MAX_CONCURRENCY)
+
+    def upload(self, file_path: str, resource_type: str = "raw", data: bytes | None = None) -> str:
         """
         Uploads a file to Cloudinary.
 
         Args:
             file_path (str): The local path to the file to upload.
             resource_type (str): The type of resource for Cloudinary (e.g., 'raw', 'video').
+            data (bytes): The file contents, if already in memory.
 
         Returns:
             str: The secure URL of the uploaded file.
         """
         try:
-            logger.info(f"Uploading {file_path} to Cloudinary...")
-            result = cloudinary_upload(file_path, resource_type=resource_type)
-            logger.info(f"Successfully uploaded to Cloudinary: {result['secure_url']}")
+            logger.info("Uploading %s to Cloudinary...", file_path)
+            source = file_path if data is None else io.BytesIO(data)
+            # Name the upload after the file even when sending bytes: otherwise the SDK calls
+            # the part "stream" and raw uploads lose their extension.
+            result = cloudinary_upload(
+                source, resource_type=resource_type, filename=os.path.basename(file_path)
+            )
+            logger.info("Successfully uploaded to Cloudinary: %s", result['secure_url'])
             return result["secure_url"]
         except Exception as e:
-            logger.error(f"Failed to upload {file_path} to Cloudinary: {e}")
+            logger.error("Failed to upload %s to Cloudinary: %s", file_path, e)
             raise
 
     def delete(self, file_url: str) -> None:
@@ -36,16 +59,27 @@ class CloudinaryAdapter(StorageAdapter):
         """
         # To implement this, you would need to parse the public_id from the file_url
         # and then call cloudinary.uploader.destroy(public_id).
-        logger.warning(f"Deletion requested for {file_url}, but this is not yet implemented.")
+        logger.warning("Deletion requested for %s, but this is not yet implemented.", file_url)
         pass
 
-    def get_signed_url(self, file_key: str) -> str:
+    def get_signed_url(self, file_key: str, expires_in: int = 3600) -> str:
         """
         Generates a signed URL for a file in Cloudinary.
+        The URL is cached in Redis, so the SDK only rebuilds and signs it on a miss.
+        """
+        return self._cached_signed_url(
+            f"cloudinary:signed:{file_key}:{expires_in}",
+            expires_in,
+            lambda: self._sign_url(file_key)
+        )
+
+    def _sign_url(self, file_key: str) -> str:
+        """
+        Builds a signed delivery URL with the Cloudinary SDK.
         (Note: This is a placeholder implementation.)
         """
         # This is a simplified example. A real implementation would involve setting up
         # private storage in Cloudinary and generating a signed URL with an expiration.
-        logger.warning(f"Signed URL requested for {file_key}, returning a standard URL as a placeholder.")
+        logger.warning("Signed URL requested for %s, returning a standard URL as a placeholder.", file_key)
         url, _ = cloudinary_url(file_key, sign_url=True)
-        return url
\ No newline at end of file
+        return url
@@ -1,8 +1,24 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from utils.logger import logger
-from config import STORAGE_BACKEND, STORAGE_MIRRORING
+from config import STORAGE_BACKEND, STORAGE_MIRRORING, STORAGE_MAX_CONCURRENCY
+from .base import UploadResult
 from .cloudinary import CloudinaryAdapter
 from .s3 import S3Adapter
 
+# Runs the mirror upload alongside the primary one; both are independent network I/O.
+_mirror_executor = ThreadPoolExecutor(max_workers=STORAGE_MAX_CONCURRENCY, thread_name_prefix="storage-mirror")
+
+# Every provider upload, primary or mirror, holds a slot while it runs, capping outbound connections.
+_upload_slots = threading.BoundedSemaphore(STORAGE_MAX_CONCURRENCY)
+
+
+def _limited_upload(provider, file_path: str, resource_type: str, data: bytes | None = None) -> str:
+    """Uploads through a provider once a slot of its own cap, if it has one, and a shared slot are free."""
+    with provider.upload_slots or nullcontext(), _upload_slots:
+        return provider.upload(file_path, resource_type, data=data)
+
 class StorageManager:
     """
     Manages storage operations, including mirroring to a secondary provider.
@@ -23,37 +39,47 @@ class StorageManager:
         else:
             raise ValueError(f"Unsupported storage backend: {STORAGE_BACKEND}")
 
-        logger.info(f"StorageManager initialized. Primary: {STORAGE_BACKEND}")
+        logger.info("StorageManager initialized. Primary: %s", STORAGE_BACKEND)
         if self.secondary_provider:
             logger.info("Storage mirroring is enabled.")
 
-    def upload(self, file_path: str, resource_type: str = "raw") -> dict:
+    def upload(self, file_path: str, resource_type: str = "raw", data: bytes | None = None) -> UploadResult:
         """
         Uploads a file to the primary storage provider and, if enabled, to the secondary provider.
 
         Args:
             file_path (str): The local path to the file to upload.
             resource_type (str): The type of resource being uploaded.
+            data (bytes): The file contents, if already in memory. Both providers upload
+                          from it instead of reading file_path from disk.
 
         Returns:
-            dict: A dictionary containing the URLs from the primary and secondary uploads.
-                  Example: {'primary_url': '...', 'secondary_url': '...'}
+            UploadResult: The URLs from the primary and secondary uploads.
+                  Example: UploadResult(primary_url='...', secondary_url='...')
         """
         if not self.primary_provider:
             raise ConnectionError("Primary storage provider is not initialized.")
 
-        # Upload to the primary provider
-        primary_url = self.primary_provider.upload(file_path, resource_type)
-        urls = {"primary_url": primary_url, "secondary_url": None}
-
-        # If mirroring is enabled, upload to the secondary provider
+        # Start the mirror upload first so it overlaps with the primary upload
+        secondary_future = None
         if self.secondary_provider:
-            try:
-                secondary_url = self.secondary_provider.upload(file_path, resource_type)
-                urls["secondary_url"] = secondary_url
-            except Exception as e:
-                logger.error(f"Failed to upload to secondary storage provider: {e}")
-                # We don't re-raise the exception because the primary upload succeeded.
-                # The mirroring is for testing and should not block the main flow.
-
-        return urls
\ No newline at end of file
+            secondary_future = _mirror_executor.submit(
+                _limited_upload, self.secondary_provider, file_path, resource_type, data
+            )
+
+        # Upload to the primary provider. The slot is released before waiting on the
+        # mirror, so callers never hold one while blocked on another.
+        primary_url = _limited_upload(self.primary_provider, file_path, resource_type, data)
+        if not secondary_future:
+            return UploadResult(primary_url, None)
+
+        # If mirroring is enabled, collect the secondary upload
+        secondary_url = None
+        try:
+            secondary_url = secondary_future.result()
+        except Exception as e:
+            logger.error("Failed to upload to secondary storage provider: %s", e)
+            # We don't re-raise the exception because the primary upload succeeded.
+            # The mirroring is for testing and should not block the main flow.
+
+        return UploadResult(primary_url, secondary_url)
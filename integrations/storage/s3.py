@@ -1,4 +1,8 @@
+import io
+import os
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 from .base import StorageAdapter
 from utils.logger import logger
@@ -9,6 +13,11 @@ class S3Adapter(StorageAdapter):
     Storage adapter for S3-compatible services.
     Uses boto3 to interact with the S3 API.
     """
+    __slots__ = (
+        "_public_url_prefix", "_transfer_config", "access_key", "bucket_name",
+        "endpoint_url", "region", "s3_client", "secret_key"
+    )
+
     def __init__(self):
         try:
             self.endpoint_url = raw_config.get("s3_endpoint_url")
@@ -16,6 +25,11 @@ class S3Adapter(StorageAdapter):
             self.access_key = raw_config.get("s3_access_key")
             self.secret_key = raw_config.get("s3_secret_key")
             self.region = raw_config.get("s3_region")
+            # Object URLs share this prefix, so build it once rather than on every upload.
+            public_base_url = raw_config.get("public_s3_base_url")
+            self._public_url_prefix = (
+                f"{public_base_url.rstrip('/')}/{self.bucket_name}" if public_base_url else None
+            )
 
             if not all([self.bucket_name, self.access_key, self.secret_key]):
                 raise ValueError("S3 bucket name and credentials must be configured.")
@@ -25,20 +39,30 @@ class S3Adapter(StorageAdapter):
                 endpoint_url=self.endpoint_url,
                 aws_access_key_id=self.access_key,
                 aws_secret_access_key=self.secret_key,
-                region_name=self.region
+                region_name=self.region,
+                # Enough pooled connections for the multipart transfer threads below.
+                config=Config(max_pool_connections=32)
+            )
+            # Large files are split into 16 MiB parts and uploaded in parallel.
+            self._transfer_config = TransferConfig(
+                multipart_threshold=8 * 1024 * 1024,
+                multipart_chunksize=16 * 1024 * 1024,
+                max_concurrency=16,
+                use_threads=True
             )
             logger.info("S3Adapter initialized successfully.")
         except (ValueError, NoCredentialsError, PartialCredentialsError) as e:
-            logger.error(f"Failed to initialize S3Adapter: {e}")
+            logger.error("Failed to initialize S3Adapter: %s", e)
             self.s3_client = None # Ensure client is None if initialization fails
 
-    def upload(self, file_path: str, resource_type: str = "raw") -> str:
+    def upload(self, file_path: str, resource_type: str = "raw", data: bytes | None = None) -> str:
         """
         Uploads a file to the configured S3 bucket.
 
         Args:
             file_path (str): The local path to the file to upload.
             resource_type (str): This argument is ignored for S3 but kept for interface compatibility.
+            data (bytes): The file contents, if already in memory.
 
         Returns:
             str: The public URL of the uploaded file.
@@ -46,27 +70,31 @@ class S3Adapter(StorageAdapter):
         if not self.s3_client:
             raise ConnectionError("S3 client is not initialized. Cannot upload.")
 
-        object_name = file_path.split('/')[-1]
+        object_name = os.path.basename(file_path)
         try:
-            logger.info(f"Uploading {file_path} to S3 bucket '{self.bucket_name}' with public-read ACL...")
-            self.s3_client.upload_file(
-                file_path,
-                self.bucket_name,
-                object_name,
-                ExtraArgs={'ACL': 'public-read'}
-            )
+            logger.info("Uploading %s to S3 bucket '%s' with public-read ACL...", file_path, self.bucket_name)
+            # Read the file through a 1 MiB buffer rather than the default few KiB.
+            with (
+                open(file_path, "rb", buffering=1 << 20) if data is None else io.BytesIO(data)
+            ) as file_obj:
+                self.s3_client.upload_fileobj(
+                    file_obj,
+                    self.bucket_name,
+                    object_name,
+                    ExtraArgs={'ACL': 'public-read'},
+                    Config=self._transfer_config
+                )
             
             # Construct the public URL using the base URL from the config
-            public_base_url = raw_config.get("public_s3_base_url")
-            if not public_base_url:
+            if not self._public_url_prefix:
                 raise ValueError("public_s3_base_url is not configured.")
 
-            url = f"{public_base_url}/{self.bucket_name}/{object_name}"
+            url = f"{self._public_url_prefix}/{object_name}"
             
-            logger.info(f"Successfully uploaded to S3: {url}")
+            logger.info("Successfully uploaded to S3: %s", url)
             return url
         except Exception as e:
-            logger.error(f"Failed to upload {file_path} to S3: {e}")
+            logger.error("Failed to upload %s to S3: %s", file_path, e)
             raise
 
     def delete(self, file_url: str) -> None:
@@ -74,19 +102,24 @@ class S3Adapter(StorageAdapter):
         Deletes a file from S3.
         (Note: This is a placeholder implementation.)
         """
-        logger.warning(f"Deletion requested for {file_url}, but this is not yet implemented for S3.")
+        logger.warning("Deletion requested for %s, but this is not yet implemented for S3.", file_url)
         pass
 
-    def get_signed_url(self, file_key: str) -> str:
+    def get_signed_url(self, file_key: str, expires_in: int = 3600) -> str:
         """
         Generates a presigned URL for a file in S3.
-        (Note: This is a placeholder implementation.)
+        The URL is cached in Redis until shortly before it expires, so repeat requests
+        skip the signing work and get a stable URL that downstream caches can hit.
         """
-        logger.warning(f"Signed URL requested for {file_key}, but this is not yet implemented for S3.")
-        # A real implementation would look like this:
-        # return self.s3_client.generate_presigned_url(
-        #     'get_object',
-        #     Params={'Bucket': self.bucket_name, 'Key': file_key},
-        #     ExpiresIn=3600  # URL expires in 1 hour
-        # )
-        return ""
\ No newline at end of file
+        if not self.s3_client:
+            raise ConnectionError("S3 client is not initialized. Cannot sign URL.")
+
+        return self._cached_signed_url(
+            f"s3:presign:{self.bucket_name}:{file_key}:{expires_in}",
+            expires_in,
+            lambda: self.s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': file_key},
+                ExpiresIn=expires_in
+            )
+        )
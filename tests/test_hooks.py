@@ -3,35 +3,83 @@ import unittest
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone
 
-from workers.hooks import on_job_completed
+from integrations.storage.base import UploadResult
+from workers.hooks import on_block_completed, on_job_completed
 
 class TestHooks(unittest.TestCase):
 
+    @patch('workers.hooks.GRAPHQL_ENABLED', True)
     @patch('workers.hooks.redis_client')
     @patch('workers.hooks.graphql_client')
     def test_on_job_completed(self, mock_graphql_client, mock_redis_client):
         # Arrange
         job_id = 'test_job_id'
-        final_urls = {'primary_url': 'http://example.com/audio.mp3'}
+        final_urls = UploadResult('http://example.com/audio.mp3', None)
         project_id = 'test_project_id'
 
-        mock_redis_client.hgetall.return_value = {
-            b'project_id': project_id.encode('utf-8'),
-            b'blocks': json.dumps([{'text': 'block 1'}]).encode('utf-8')
-        }
+        mock_redis_client.pipeline.return_value.execute.return_value = [
+            [project_id, json.dumps([{'text': 'block 1'}])],
+            [
+                json.dumps({
+                    'index': 0,
+                    'urls': {'primary_url': 'http://example.com/block0.wav'},
+                    'local_path': 'temp/test_job_id_block0.wav'
+                })
+            ]
+        ]
 
         # Act
-        on_job_completed(job_id, final_urls)
+        on_job_completed(job_id, final_urls).result()
 
         # Assert
-        mock_graphql_client.insert_blocks.assert_called_once()
-        call_args = mock_graphql_client.insert_blocks.call_args[1]
-
-        self.assertEqual(call_args['project_id'], project_id)
-        self.assertEqual(call_args['content'], 'final_audio')
-        self.assertEqual(call_args['s3_url'], 'http://example.com/audio.mp3')
-        self.assertEqual(call_args['block_index'], -1)
-        self.assertIn('created_at', call_args)
+        mock_graphql_client.insert_blocks_bulk.assert_called_once()
+        rows = mock_graphql_client.insert_blocks_bulk.call_args[0][0]
+        self.assertEqual(len(rows), 2)
+        block_row, merged_row = rows
+
+        self.assertEqual(block_row['project_id'], project_id)
+        self.assertEqual(block_row['content'], 'block 1')
+        self.assertEqual(block_row['s3_url'], 'http://example.com/block0.wav')
+        self.assertEqual(block_row['block_index'], '0')
+
+        self.assertEqual(merged_row['project_id'], project_id)
+        self.assertEqual(merged_row['content'], 'merged_blocks')
+        self.assertEqual(merged_row['s3_url'], 'http://example.com/audio.mp3')
+        self.assertEqual(merged_row['block_index'], 'merged_blocks')
+        self.assertIn('created_at', merged_row)
+
+    @patch('workers.hooks.GRAPHQL_ENABLED', True)
+    @patch('workers.hooks.redis_client')
+    @patch('workers.hooks.graphql_client')
+    def test_on_job_completed_with_parsed_blocks(self, mock_graphql_client, mock_redis_client):
+        block_info = [{
+            'index': 0,
+            'urls': {'primary_url': 'http://example.com/block0.wav'},
+            'local_path': 'temp/test_job_id_block0.wav'
+        }]
+
+        on_job_completed(
+            'test_job_id',
+            UploadResult('http://example.com/audio.mp3', None),
+            project_id='test_project_id',
+            blocks_config=[{'text': 'block 1'}],
+            block_info=block_info
+        ).result()
+
+        mock_redis_client.pipeline.assert_not_called()
+        rows = mock_graphql_client.insert_blocks_bulk.call_args[0][0]
+        self.assertEqual([row['block_index'] for row in rows], ['0', 'merged_blocks'])
+        self.assertEqual(rows[0]['content'], 'block 1')
+        self.assertEqual(rows[0]['project_id'], 'test_project_id')
+
+    @patch('workers.hooks.GRAPHQL_ENABLED', True)
+    @patch('workers.hooks.redis_client')
+    @patch('workers.hooks.graphql_client')
+    def test_on_block_completed_defers_graphql_write(self, mock_graphql_client, mock_redis_client):
+        on_block_completed('test_job_id', 'test_project_id', 0, urls={'primary_url': 'http://example.com/block0.wav'})
+
+        mock_graphql_client.insert_blocks.assert_not_called()
+        mock_graphql_client.insert_blocks_bulk.assert_not_called()
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import fakeredis
+
+from utils.rate_limiter import register_token_bucket
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.bucket = register_token_bucket(self.redis)
+
+    def take(self, now, rate=1.0, burst=3):
+        return self.bucket(keys=["ratelimit:alice"], args=[now, rate, burst])
+
+    def test_allows_burst_then_denies(self):
+        self.assertEqual([self.take(1000.0) for _ in range(4)], [1, 1, 1, 0])
+
+    def test_refills_at_rate(self):
+        for _ in range(3):
+            self.take(1000.0)
+        self.assertEqual(self.take(1000.5), 0)
+        # Half a token was already credited; another half second completes it.
+        self.assertEqual(self.take(1001.0), 1)
+        self.assertEqual(self.take(1001.0), 0)
+
+    def test_refill_is_capped_at_burst(self):
+        self.take(1000.0)
+        results = [self.take(5000.0) for _ in range(4)]
+        self.assertEqual(results, [1, 1, 1, 0])
+
+    def test_buckets_are_per_key(self):
+        for _ in range(3):
+            self.take(1000.0)
+        self.assertEqual(self.bucket(keys=["ratelimit:bob"], args=[1000.0, 1.0, 3]), 1)
+
+    def test_bucket_expires_once_it_would_be_full(self):
+        self.take(1000.0, rate=0.5, burst=3)
+        ttl = self.redis.ttl("ratelimit:alice")
+        self.assertGreater(ttl, 0)
+        self.assertLessEqual(ttl, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import threading
+import unittest
+
+from integrations.storage import manager
+
+
+class BlockingProvider:
+    """Provider with its own one-slot cap whose uploads wait until released."""
+
+    def __init__(self):
+        self.upload_slots = threading.BoundedSemaphore(1)
+        self.release = threading.Event()
+
+    def upload(self, file_path, resource_type="raw", data=None):
+        self.release.wait(5)
+        return f"http://capped/{file_path}"
+
+
+class InstantProvider:
+    upload_slots = None
+
+    def upload(self, file_path, resource_type="raw", data=None):
+        return f"http://uncapped/{file_path}"
+
+
+class TestLimitedUpload(unittest.TestCase):
+
+    def test_uploads_queued_on_a_capped_provider_leave_shared_slots_free(self):
+        capped = BlockingProvider()
+        waiting = [
+            threading.Thread(target=manager._limited_upload, args=(capped, f"block{i}.wav", "raw"))
+            for i in range(manager.STORAGE_MAX_CONCURRENCY + 2)
+        ]
+        for thread in waiting:
+            thread.start()
+        self.addCleanup(lambda: [thread.join() for thread in waiting])
+        self.addCleanup(capped.release.set)
+
+        result = []
+        other = threading.Thread(
+            target=lambda: result.append(manager._limited_upload(InstantProvider(), "final.mp3", "raw"))
+        )
+        other.start()
+        other.join(2)
+
+        self.assertEqual(result, ["http://uncapped/final.mp3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import fakeredis
+
+from integrations.storage.base import UploadResult
+from utils.schemas import JobStatus
+from workers import tts_worker
+
+JOB_ID = 'test_job_id'
+
+
+class TestRecordBlocks(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.redis.hset(f"job:{JOB_ID}", mapping={
+            "status": JobStatus.QUEUED,
+            "blocks_total": 2,
+            "blocks_done": 0,
+            "project_id": "test_project_id"
+        })
+
+        patchers = [
+            patch.object(tts_worker, 'redis_client', self.redis),
+            patch.object(tts_worker, 'record_blocks', self.redis.register_script(tts_worker.RECORD_BLOCKS_LUA)),
+            patch.object(tts_worker, 'on_block_completed'),
+            patch.object(tts_worker, 'on_block_failed'),
+            patch.object(tts_worker.combine_blocks, 'delay'),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def job(self):
+        return self.redis.hgetall(f"job:{JOB_ID}")
+
+    def rendered(self, block_index):
+        return (block_index, f"temp/{JOB_ID}_block{block_index}.wav", UploadResult(f"http://example.com/{block_index}", None))
+
+    def test_records_blocks_and_combines_when_done(self):
+        tts_worker._record_blocks(JOB_ID, [self.rendered(0)])
+        tts_worker.combine_blocks.delay.assert_not_called()
+
+        tts_worker._record_blocks(JOB_ID, [self.rendered(1)])
+
+        self.assertEqual(self.job()["status"], JobStatus.PROCESSING)
+        self.assertEqual(self.job()["blocks_done"], "2")
+        entries = [json.loads(entry) for entry in self.redis.lrange(f"job:{JOB_ID}:block_urls", 0, -1)]
+        self.assertEqual([entry["index"] for entry in entries], [0, 1])
+        self.assertEqual(entries[1]["urls"], {"primary_url": "http://example.com/1", "secondary_url": None})
+        tts_worker.on_block_completed.assert_called_with(
+            JOB_ID, "test_project_id", 1, urls=UploadResult("http://example.com/1", None)
+        )
+        tts_worker.combine_blocks.delay.assert_called_once_with(JOB_ID)
+
+    def test_records_a_batch_in_one_call(self):
+        tts_worker._record_blocks(JOB_ID, [self.rendered(0), self.rendered(1)], blocks_total=2, project_id="given")
+
+        self.assertEqual(self.job()["blocks_done"], "2")
+        self.assertEqual(self.redis.llen(f"job:{JOB_ID}:block_urls"), 2)
+        self.assertEqual(tts_worker.on_block_completed.call_count, 2)
+        self.assertEqual(tts_worker.on_block_completed.call_args[0][1], "given")
+        tts_worker.combine_blocks.delay.assert_called_once_with(JOB_ID)
+
+    def test_batch_failure_is_not_overwritten(self):
+        def render(job_id, block_index, text, provider_name, voice_id):
+            if block_index == 0:
+                raise RuntimeError("provider down")
+            return self.rendered(block_index)[1:]
+
+        with patch.object(tts_worker, '_render_block', side_effect=render):
+            tts_worker.process_block_batch(
+                JOB_ID, [(0, "a", 0, "kokoro", "0"), (1, "b", 0, "kokoro", "0")], blocks_total=2
+            )
+
+        self.assertEqual(self.job()["status"], JobStatus.FAILED)
+        self.assertEqual(self.job()["blocks_done"], "1")
+        tts_worker.on_block_failed.assert_called_once_with(JOB_ID, 0, error="provider down")
+        tts_worker.combine_blocks.delay.assert_not_called()
+
+
+class TestCleanupTempFiles(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = temp_dir.name
+        self.silence_dir = os.path.join(self.temp_dir, "silence")
+        os.makedirs(self.silence_dir)
+        for patcher in [
+            patch.object(tts_worker, 'TEMP_DIR', self.temp_dir),
+            patch.object(tts_worker, 'SILENCE_DIR', self.silence_dir),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def touch(self, *parts, age=0):
+        path = os.path.join(*parts)
+        open(path, "wb").close()
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_removes_only_expired_files_from_both_directories(self):
+        expired = [
+            self.touch(self.temp_dir, f"{JOB_ID}_final.mp3", age=7200),
+            self.touch(self.silence_dir, "500ms_24000_1.mp3", age=7200),
+            self.touch(self.silence_dir, "tmpabc123.tmp", age=7200),
+        ]
+        kept = [
+            self.touch(self.temp_dir, f"{JOB_ID}_block0.wav"),
+            self.touch(self.silence_dir, "250ms_24000_1.mp3"),
+        ]
+
+        tts_worker.cleanup_temp_files(3600)
+
+        self.assertEqual([path for path in expired if os.path.exists(path)], [])
+        self.assertEqual([path for path in kept if os.path.exists(path)], kept)
+        self.assertTrue(os.path.isdir(self.silence_dir))
+
+
+class TestCleanupExpiredJobFiles(unittest.TestCase):
+
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        patcher = patch.object(tts_worker, 'redis_client', self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.paths = []
+        for name in ("expired.mp3", "fresh.mp3"):
+            self.paths.append(os.path.join(temp_dir.name, name))
+            open(self.paths[-1], "wb").close()
+
+    def test_removes_only_expired_files(self):
+        expired, fresh = self.paths
+        self.redis.zadd(tts_worker.TEMP_EXPIRY_KEY, {expired: time.time() - 1, fresh: time.time() + 3600})
+
+        tts_worker.cleanup_expired_job_files()
+
+        self.assertFalse(os.path.exists(expired))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertEqual(self.redis.zrange(tts_worker.TEMP_EXPIRY_KEY, 0, -1), [fresh])
+
+
+def mp3_frame_header(version=3, layer=1, rate_index=0, channel_mode=0):
+    """Builds a 4-byte MPEG audio frame header; version 3 is MPEG-1 and layer 1 is Layer III."""
+    return bytes([
+        0xFF,
+        0xE0 | (version << 3) | (layer << 1) | 1,
+        (9 << 4) | (rate_index << 2),
+        channel_mode << 6
+    ])
+
+
+class TestMp3Format(unittest.TestCase):
+
+    def mp3_format(self, data):
+        fd, path = tempfile.mkstemp(suffix=".mp3")
+        self.addCleanup(os.unlink, path)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return tts_worker._mp3_format(path)
+
+    def test_reads_mpeg1_stereo(self):
+        self.assertEqual(self.mp3_format(mp3_frame_header() + bytes(100)), (44100, 2))
+
+    def test_reads_mono(self):
+        self.assertEqual(self.mp3_format(mp3_frame_header(rate_index=1, channel_mode=3)), (48000, 1))
+
+    def test_reads_mpeg2_and_mpeg25_rates(self):
+        self.assertEqual(self.mp3_format(mp3_frame_header(version=2)), (22050, 2))
+        self.assertEqual(self.mp3_format(mp3_frame_header(version=0, rate_index=2)), (8000, 2))
+
+    def test_skips_id3v2_tag(self):
+        # Syncsafe size 0x81 = 129 bytes of tag body.
+        tag = b"ID3\x03\x00\x00" + bytes([0, 0, 1, 1]) + bytes(129)
+        self.assertEqual(self.mp3_format(tag + mp3_frame_header(channel_mode=3)), (44100, 1))
+
+    def test_skips_id3v2_tag_with_footer(self):
+        tag = b"ID3\x04\x00\x10" + bytes([0, 0, 0, 5]) + bytes(5) + b"3DI" + bytes(7)
+        self.assertEqual(self.mp3_format(tag + mp3_frame_header()), (44100, 2))
+
+    def test_rejects_other_layers(self):
+        self.assertIsNone(self.mp3_format(mp3_frame_header(layer=2)))
+        self.assertIsNone(self.mp3_format(mp3_frame_header(layer=3)))
+
+    def test_rejects_reserved_values(self):
+        self.assertIsNone(self.mp3_format(mp3_frame_header(version=1)))
+        self.assertIsNone(self.mp3_format(mp3_frame_header(rate_index=3)))
+
+    def test_rejects_non_mp3(self):
+        self.assertIsNone(self.mp3_format(b"RIFF\x24\x00\x00\x00WAVEfmt "))
+        self.assertIsNone(self.mp3_format(b""))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+# utils/rate_limiter.py
+
+# Token bucket evaluated atomically inside Redis, so every API worker shares the
+# same limit and each decision costs a single round-trip.
+#   KEYS[1] = bucket key
+#   ARGV[1] = current time (seconds), ARGV[2] = refill rate (tokens/second), ARGV[3] = burst size
+# Returns 1 if the request may proceed, 0 if it should be rejected.
+TOKEN_BUCKET_LUA = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+def register_token_bucket(redis):
+    """
+    Registers the token bucket script with a Redis client and returns the callable
+    script object (invoked via EVALSHA, with an automatic EVAL fallback).
+    """
+    return redis.register_script(TOKEN_BUCKET_LUA)
@@ -2,8 +2,20 @@
 import os
 import redis
 
+import config
+
 # Get the Redis URL from an environment variable, with a default for local dev
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+# A bounded pool shared by every worker greenlet: callers wait for a free connection
+# instead of failing when it is exhausted. Responses come back as str, not bytes.
+pool = redis.BlockingConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=config.REDIS_MAX_CONNECTIONS,
+    decode_responses=True,
+    socket_keepalive=True,
+    health_check_interval=30
+)
+
 # Create a reusable Redis client instance
-redis_client = redis.from_url(REDIS_URL)
\ No newline at end of file
+redis_client = redis.Redis(connection_pool=pool)
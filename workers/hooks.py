@@ -1,58 +1,90 @@
-import json
+import orjson
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from datetime import time, datetime, timezone
 from config import GRAPHQL_ENABLED
 from integrations.graphql_client import graphql_client
+from integrations.storage.base import UploadResult
 from utils.logger import logger
 from utils.redis_client import redis_client
 
+# GraphQL writes run here so the Celery task can finish without waiting on Hasura.
+_hook_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hook")
+atexit.register(_hook_executor.shutdown, wait=True)
+
 def on_block_completed(job_id: str, project_id: str, block_index: int, urls: dict, duration: float = 0):
     """
     Hook called when a single text block has been successfully processed.
+    The block's GraphQL row is written together with the rest of the job in on_job_completed.
     """
-    logger.info(f"[HOOK] Block completed for job {job_id}, index {block_index}. URLs: {urls}")
-    if GRAPHQL_ENABLED and graphql_client:
-        # Get the block text from Redis
-        job_data = redis_client.hgetall(f"job:{job_id}")
-        job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-        blocks_config = json.loads(job["blocks"])
-        block_text = blocks_config[block_index]["text"]
+    logger.info("[HOOK] Block completed for job %s, index %s. URLs: %s", job_id, block_index, urls)
 
-        # Format the timestamp
-        created_at = datetime.now(timezone.utc).isoformat()
-
-        graphql_client.insert_blocks(
-            project_id=project_id,
-            content=block_text,
-            s3_url=urls.get("primary_url"),
-            block_index=str(block_index),
-            created_at=created_at
+def on_job_completed(
+    job_id: str,
+    final_urls: UploadResult,
+    duration: float = 0,
+    size: int = 0,
+    project_id: str | None = None,
+    blocks_config: list | None = None,
+    block_info: list | None = None
+):
+    """
+    Hook called when a job is fully completed. This inserts every block of the job,
+    plus the merged result, into GraphQL with a single bulk mutation.
+    Callers that have already parsed the job's blocks can pass them in to skip re-reading Redis.
+    The write runs in the background; the returned future (None when GraphQL is disabled)
+    can be waited on.
+    """
+    logger.info("[HOOK] Job completed for %s. Final URLs: %s", job_id, final_urls)
+    if GRAPHQL_ENABLED and graphql_client:
+        return _hook_executor.submit(
+            _insert_job_blocks, job_id, final_urls, project_id, blocks_config, block_info
         )
 
-def on_job_completed(job_id: str, final_urls: dict, duration: float = 0, size: int = 0):
+def _insert_job_blocks(job_id: str, final_urls: UploadResult, project_id: str, blocks_config: list, block_info: list):
     """
-    Hook called when a job is fully completed. This updates the job status in GraphQL.
+    Writes the GraphQL rows for a completed job. Runs on the hook executor.
     """
-    logger.info(f"[HOOK] Job completed for {job_id}. Final URLs: {final_urls}")
-    if GRAPHQL_ENABLED and graphql_client:
-        job_data = redis_client.hgetall(f"job:{job_id}")
-        job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-        project_id = job.get("project_id")
+    try:
+        if blocks_config is None or block_info is None:
+            # Fetch only the fields needed, together with the block list, in one round-trip.
+            pipe = redis_client.pipeline()
+            pipe.hmget(f"job:{job_id}", "project_id", "blocks")
+            pipe.lrange(f"job:{job_id}:block_urls", 0, -1)
+            (project_id, blocks), block_urls = pipe.execute()
+
+            blocks_config = orjson.loads(blocks)
+            block_info = sorted((orjson.loads(entry) for entry in block_urls), key=lambda x: x["index"])
 
         created_at = datetime.now(timezone.utc).isoformat()
 
-        graphql_client.insert_blocks(
-            project_id=project_id,
-            content="merged_blocks",
-            s3_url=final_urls.get("primary_url"),
-            block_index="merged_blocks",
-            created_at=created_at,
-        )
+        rows = [
+            {
+                "project_id": project_id,
+                "content": blocks_config[entry["index"]]["text"],
+                "s3_url": entry["urls"].get("primary_url"),
+                "block_index": str(entry["index"]),
+                "created_at": created_at,
+            }
+            for entry in block_info
+        ]
+        rows.append({
+            "project_id": project_id,
+            "content": "merged_blocks",
+            "s3_url": final_urls.primary_url,
+            "block_index": "merged_blocks",
+            "created_at": created_at,
+        })
+        graphql_client.insert_blocks_bulk(rows)
+    except Exception as e:
+        # Nobody waits on this in production, so make sure failures reach the logs.
+        logger.error("[HOOK] Failed to record blocks for job %s in GraphQL: %s", job_id, e)
 
 def on_block_failed(job_id: str, block_index: int, error: str):
     """
     Hook called when a block fails. This marks the entire job as failed in GraphQL.
     """
-    logger.error(f"[HOOK] Block failed for job {job_id}, index {block_index}. Error: {error}")
+    logger.error("[HOOK] Block failed for job %s, index %s. Error: %s", job_id, block_index, error)
     if GRAPHQL_ENABLED and graphql_client:
         pass
 
@@ -60,6 +92,6 @@ def on_job_failed(job_id: str, error: str):
     """
     Hook called when the job combination fails. This marks the job as failed in GraphQL.
     """
-    logger.error(f"[HOOK] Job failed for {job_id}. Error: {error}")
+    logger.error("[HOOK] Job failed for %s. Error: %s", job_id, error)
     if GRAPHQL_ENABLED and graphql_client:
         pass
\ No newline at end of file
@@ -2,12 +2,47 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def build_session(headers: Dict[str, str]) -> requests.Session:
+    """
+    Creates a pooled HTTP session for a provider so block requests reuse keep-alive
+    connections instead of paying a TCP/TLS handshake on every call.
+    Transient failures (429/5xx) are retried with a short backoff.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=32,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=frozenset(["POST"]),
+            raise_on_status=False
+        )
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(headers)
+    return session
+
 class TTSProvider(ABC):
     """
     Abstract base class for a Text-to-Speech provider.
     This defines the "contract" that all specific provider implementations must follow.
     """
 
+    # Empty so subclasses that declare __slots__ get no per-instance __dict__.
+    __slots__ = ()
+
+    # The container generate_audio writes, used as the block file's extension. With
+    # MP3_STREAM_COPY on, MP3 blocks are joined without re-encoding.
+    preferred_format = "wav"
+
     @abstractmethod
     def generate_audio(self, text: str, voice_id: str, output_path: str) -> None:
         """
@@ -4,19 +4,22 @@ from .base import TTSProvider
 from utils.logger import logger
 
 class ElevenLabsProvider(TTSProvider):
+    __slots__ = ("client", "voices")
+    preferred_format = "mp3"
+
     def __init__(self, api_key: str, voices: Dict[str, str]):
         self.client = ElevenLabs(api_key=api_key)
         self.voices = voices
 
     def generate_audio(self, text: str, voice_id: str, output_path: str) -> None:
-        logger.info(f"Generating audio for text: '{text[:30]}...' with ElevenLabs voice: {voice_id}")
+        logger.info("Generating audio for text: '%.30s...' with ElevenLabs voice: %s", text, voice_id)
         try:
             audio = self.client.text_to_speech.convert(voice_id=voice_id, text=text)
+            # The SDK yields a plain iterator of byte chunks; writelines drains it without a Python-level loop.
             with open(output_path, "wb") as f:
-                for chunk in audio:
-                    f.write(chunk)
+                f.writelines(audio)
         except Exception as e:
-            logger.error(f"An unexpected error occurred while generating audio with ElevenLabs: {e}")
+            logger.error("An unexpected error occurred while generating audio with ElevenLabs: %s", e)
             raise
 
     def get_voices(self) -> List[Dict[str, str]]:
@@ -1,52 +1,67 @@
 
+import shutil
+import orjson
 import requests
 import base64
 from typing import List, Dict
-from .base import TTSProvider
+from .base import TTSProvider, build_session
 from utils.logger import logger
 
 class KokoroProvider(TTSProvider):
     """
     Provider for the Kokoro TTS API.
     """
+    __slots__ = ("api_base_url", "headers", "session")
+
     def __init__(self, api_base_url: str, **kwargs):
         if not api_base_url:
             raise ValueError("Kokoro API base URL is not configured.")
         
         self.api_base_url = api_base_url
         self.headers = {
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            # Prefer raw audio when the server can send it; JSON with base64 audio is the fallback.
+            'Accept': 'audio/*, application/json;q=0.9'
         }
+        self.session = build_session(self.headers)
 
     def _make_request(self, payload: dict, output_path: str):
         try:
-            response = requests.post(self.api_base_url, headers=self.headers, json=payload, timeout=60)
+            response = self.session.post(self.api_base_url, data=orjson.dumps(payload), stream=True, timeout=60)
             response.raise_for_status()
+
+            if response.headers.get("Content-Type", "").startswith("audio/"):
+                # Binary response: stream it to disk without holding it in memory
+                response.raw.decode_content = True
+                with open(output_path, "wb") as f:
+                    shutil.copyfileobj(response.raw, f, 1 << 20)
+                return
+
             data = response.json()
 
             if "audio" not in data:
                 raise ValueError("No audio data returned from API")
 
-            # Decode Base64 audio
-            audio_b64 = data["audio"].split(",")[1]
-            audio_bytes = base64.b64decode(audio_b64)
+            # Decode Base64 audio, slicing past the data-URI prefix instead of splitting the whole string
+            audio = data["audio"]
+            audio_b64 = audio[audio.find(",") + 1:]
 
             # Save to file
             with open(output_path, "wb") as f:
-                f.write(audio_bytes)
+                f.write(base64.b64decode(audio_b64))
                     
         except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to call Kokoro API: {e}")
+            logger.error("Failed to call Kokoro API: %s", e)
             raise ConnectionError(f"Failed to call Kokoro API: {e}")
         except Exception as e:
-            logger.error(f"An unexpected error occurred while generating audio with Kokoro: {e}")
+            logger.error("An unexpected error occurred while generating audio with Kokoro: %s", e)
             raise
 
     def generate_audio(self, text: str, voice_id: str, output_path: str) -> None:
         """
         Generates audio from text and saves it to a file.
         """
-        logger.info(f"Generating audio for text: '{text[:30]}...' with Kokoro voice: {voice_id}")
+        logger.info("Generating audio for text: '%.30s...' with Kokoro voice: %s", text, voice_id)
         
         payload = {
             "text": text,
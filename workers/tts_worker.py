@@ -1,9 +1,16 @@
+import io
 import os
-import json
+import subprocess
+import tempfile
+import wave
+import orjson
 import time
 from celery import Celery
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
+from functools import lru_cache
 from pydub import AudioSegment
+import config
 from integrations.storage import storage_manager
 
 from workers.providers import provider_factory
@@ -22,131 +29,455 @@ celery_app = Celery(
 
 # --- ## NEW: Add Beat Schedule Configuration ## ---
 celery_app.conf.beat_schedule = {
-    'cleanup-old-temp-files-every-hour': {
+    # Removes the files of combined jobs as they expire, without scanning TEMP_DIR.
+    'cleanup-expired-job-files': {
+        'task': 'workers.tts_worker.cleanup_expired_job_files',
+        'schedule': timedelta(minutes=1),
+    },
+    # Catches the rest, such as the blocks of jobs that failed before combining,
+    # so nothing outlives two retention periods.
+    'cleanup-old-temp-files': {
         'task': 'workers.tts_worker.cleanup_temp_files',
-        'schedule': timedelta(hours=1),  # Runs every hour
-        'args': (3600,)  # Files older than 3600 seconds (1 hour) will be deleted
+        'schedule': timedelta(seconds=config.TEMP_RETENTION_SECONDS),  # Runs once per retention period
+        'args': (config.TEMP_RETENTION_SECONDS,)  # Files older than the retention period will be deleted
     },
 }
 celery_app.conf.timezone = 'UTC'
+celery_app.conf.worker_concurrency = config.WORKER_CONCURRENCY
+# Reserve one message per slot so blocks stay queued in Redis, where idle workers can take them.
+celery_app.conf.worker_prefetch_multiplier = 1
 # --- End New Config ---
 
 TEMP_DIR = "temp"
 os.makedirs(TEMP_DIR, exist_ok=True)
+BLOCK_DECODE_CONCURRENCY = 8
+CLEANUP_CONCURRENCY = 16
+# Sorted set of temp file paths scored by the time they expire.
+TEMP_EXPIRY_KEY = "temp_files:expiry"
+# Silent MP3 clips for the pauses between stream-copied blocks. Kept in a subdirectory since they
+# are shared by every job; the sweep only removes clips that have gone unused for a retention period.
+SILENCE_DIR = os.path.join(TEMP_DIR, "silence")
+os.makedirs(SILENCE_DIR, exist_ok=True)
+# MPEG audio version bits of a frame header -> sample rates for that version.
+MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+# Records finished blocks in one atomic round-trip: appends their entries to the job's
+# block list, marks the job as processing unless a block has already failed it, and
+# bumps blocks_done by the number recorded.
+#   KEYS[1] = job:{id}:block_urls, KEYS[2] = job:{id}
+#   ARGV[1], ARGV[2] = processing and failed statuses
+#   ARGV[3], ARGV[4] = blocks_total and project_id if the task was given them, else ''
+#   ARGV[5..n] = block entries (JSON)
+# Returns {blocks_done, blocks_total, project_id}.
+RECORD_BLOCKS_LUA = """
+redis.call('RPUSH', KEYS[1], unpack(ARGV, 5))
+if redis.call('HGET', KEYS[2], 'status') ~= ARGV[2] then
+    redis.call('HSET', KEYS[2], 'status', ARGV[1])
+end
+local done = redis.call('HINCRBY', KEYS[2], 'blocks_done', #ARGV - 4)
+local total = tonumber(ARGV[3]) or tonumber(redis.call('HGET', KEYS[2], 'blocks_total'))
+local project_id = ARGV[4]
+if project_id == '' then
+    project_id = redis.call('HGET', KEYS[2], 'project_id')
+end
+return {done, total, project_id}
+"""
+record_blocks = redis_client.register_script(RECORD_BLOCKS_LUA)
 
 
 # --- ## NEW: Cleanup Task ## ---
+def _safe_unlink(file_path: str) -> int:
+    """Deletes a file, returning 1 if it was removed and 0 otherwise."""
+    try:
+        os.unlink(file_path)
+        return 1
+    except FileNotFoundError:
+        return 0
+    except OSError as e:
+        logger.error("Error deleting file %s: %s", file_path, e)
+        return 0
+
+
+def _expired_files(directory, max_age_seconds, now):
+    """Returns the paths of the files directly in directory that are older than max_age_seconds."""
+    expired_paths = []
+    # scandir entries carry the file type from the directory read, so only the mtime needs a stat.
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                # If the file is older than the max age, queue it for deletion
+                if entry.is_file(follow_symlinks=False) and (now - entry.stat().st_mtime) > max_age_seconds:
+                    expired_paths.append(entry.path)
+            except FileNotFoundError:
+                # Already removed, e.g. by a concurrent cleanup run
+                pass
+            except OSError as e:
+                logger.error("Error checking file %s: %s", entry.path, e)
+    return expired_paths
+
+
 @celery_app.task
 def cleanup_temp_files(max_age_seconds: int):
     """
-    Scans the TEMP_DIR and deletes any files older than max_age_seconds.
+    Scans the TEMP_DIR and SILENCE_DIR and deletes any files older than max_age_seconds.
     """
-    logger.info(f"Running scheduled cleanup of files older than {max_age_seconds} seconds...")
+    logger.info("Running scheduled cleanup of files older than %s seconds...", max_age_seconds)
     now = time.time()
-    deleted_count = 0
-    for filename in os.listdir(TEMP_DIR):
-        file_path = os.path.join(TEMP_DIR, filename)
-        try:
-            if os.path.isfile(file_path):
-                # Get the file's last modification time
-                file_mtime = os.path.getmtime(file_path)
-                # If the file is older than the max age, delete it
-                if (now - file_mtime) > max_age_seconds:
-                    os.remove(file_path)
-                    deleted_count += 1
-        except Exception as e:
-            logger.error(f"Error deleting file {file_path}: {e}")
-    logger.info(f"Cleanup complete. Deleted {deleted_count} old file(s).")
-# --- End New Task ---
+    expired_paths = _expired_files(TEMP_DIR, max_age_seconds, now) + _expired_files(SILENCE_DIR, max_age_seconds, now)
+
+    # Unlinks are latency-bound, so overlap them rather than removing files one by one.
+    with ThreadPoolExecutor(max_workers=CLEANUP_CONCURRENCY) as executor:
+        deleted_count = sum(executor.map(_safe_unlink, expired_paths))
+    logger.info("Cleanup complete. Deleted %d old file(s).", deleted_count)
 
 
-# --- Existing Celery Tasks (Unchanged) ---
 @celery_app.task
-def process_block(job_id, block_index, text, wait_after_ms, provider_name, voice_id):
+def cleanup_expired_job_files():
     """
-    Delegates audio generation to the correct provider, uploads the result,
-    and updates the job status in Redis.
+    Deletes the temp files whose expiry, recorded by combine_blocks, has passed.
     """
-    file_path = ""
+    now = time.time()
+    # Read and removed in one transaction, so concurrent runs never delete the same paths twice.
+    pipe = redis_client.pipeline()
+    pipe.zrangebyscore(TEMP_EXPIRY_KEY, "-inf", now)
+    pipe.zremrangebyscore(TEMP_EXPIRY_KEY, "-inf", now)
+    expired_paths, _ = pipe.execute()
+    if not expired_paths:
+        return
+
+    with ThreadPoolExecutor(max_workers=CLEANUP_CONCURRENCY) as executor:
+        deleted_count = sum(executor.map(_safe_unlink, expired_paths))
+    logger.info("Deleted %d expired job file(s).", deleted_count)
+# --- End New Task ---
+
+
+# --- Audio Helpers ---
+def _load_block_audio(path):
+    """
+    Reads a block file once and decodes it from memory.
+
+    A block's extension is only the format its provider prefers, so the header is sniffed
+    instead: real WAV data is parsed directly with no ffmpeg call, and anything else goes
+    straight to ffmpeg over a pipe.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        return AudioSegment(data=data)
+    return AudioSegment.from_file(io.BytesIO(data))
+
+
+@lru_cache(maxsize=64)
+def _silence(wait_ms, frame_rate, frame_width):
+    """Returns the raw PCM for wait_ms of silence. Jobs reuse a handful of pauses, so these are cached."""
+    return bytes(int(wait_ms * frame_rate / 1000) * frame_width)
+
+
+def _concatenate_segments(segments, waits_ms):
+    """
+    Joins audio segments, each followed by its wait in silence, into one AudioSegment.
+
+    The raw PCM is appended to a single bytearray and wrapped once at the end, instead of
+    `+=` on AudioSegment, which copies the whole growing track on every append. Segments
+    are first converted to the highest frame rate, sample width and channel count among
+    them, which is what pydub does when appending.
+    """
+    if not segments:
+        return AudioSegment.empty()
+
+    frame_rate = max(seg.frame_rate for seg in segments)
+    sample_width = max(seg.sample_width for seg in segments)
+    channels = max(seg.channels for seg in segments)
+    frame_width = sample_width * channels
+
+    buf = bytearray()
+    for seg, wait_ms in zip(segments, waits_ms):
+        seg = seg.set_frame_rate(frame_rate).set_sample_width(sample_width).set_channels(channels)
+        buf += seg.raw_data
+        if wait_ms > 0:
+            buf += _silence(wait_ms, frame_rate, frame_width)
+
+    return AudioSegment(data=bytes(buf), sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+
+def _wav_format(path):
+    """Returns (frame_rate, channels) from a WAV header, or None if the file is not a readable WAV."""
     try:
-        provider = provider_factory.get(provider_name)
-        if not provider:
-            raise ValueError(f"Provider '{provider_name}' not found in factory.")
+        with wave.open(path, "rb") as f:
+            return f.getframerate(), f.getnchannels()
+    except (wave.Error, EOFError):
+        return None
+
 
-        file_path = os.path.join(TEMP_DIR, f"{job_id}_block{block_index}.wav")
+def _ffmpeg_encode_wavs(paths, waits_ms, output_path):
+    """
+    Joins WAV blocks, each followed by its wait in silence, and encodes the result to an MP3
+    at output_path in a single ffmpeg run, so the PCM never passes through Python. Every input
+    is resampled to the highest frame rate and channel count among them, as
+    _concatenate_segments does.
 
-        provider.generate_audio(text=text, voice_id=voice_id, output_path=file_path)
+    Returns False without running ffmpeg if any block is not a WAV, in which case its format
+    is unknown until decoded and the caller falls back to pydub.
+    """
+    formats = [_wav_format(path) for path in paths]
+    if not formats or None in formats:
+        return False
+    frame_rate = max(rate for rate, _ in formats)
+    channels = max(count for _, count in formats)
 
-        upload_urls = storage_manager.upload(file_path, resource_type="raw")
+    cmd = [AudioSegment.converter, "-y", "-v", "error"]
+    chains = []
+    for i, (path, wait_ms) in enumerate(zip(paths, waits_ms)):
+        cmd += ["-i", path]
+        chain = f"[{i}:a]aresample={frame_rate},aformat=channel_layouts={channels}c"
+        if wait_ms > 0:
+            chain += f",apad=pad_len={int(wait_ms * frame_rate / 1000)}"
+        chains.append(f"{chain}[a{i}]")
+    inputs = "".join(f"[a{i}]" for i in range(len(paths)))
+    graph = ";".join(chains) + f";{inputs}concat=n={len(paths)}:v=0:a=1[out]"
+    # Written to a file rather than a pipe so the encoder can seek back and add the gapless header.
+    cmd += ["-filter_complex", graph, "-map", "[out]", "-f", "mp3", output_path]
 
-        pipe = redis_client.pipeline()
-        current_urls_str = redis_client.hget(f"job:{job_id}", "block_urls")
-        current_urls = json.loads(current_urls_str)
-        current_urls.append({
-            "index": block_index,
-            "urls": upload_urls,
-            "local_path": file_path
-        })
-        pipe.hset(f"job:{job_id}", "block_urls", json.dumps(current_urls))
-        pipe.hset(f"job:{job_id}", "status", JobStatus.PROCESSING)
-        pipe.hincrby(f"job:{job_id}", "blocks_done", 1)
-        results = pipe.execute()
-        new_done_count = results[-1]
-
-        project_id = redis_client.hget(f"job:{job_id}", "project_id").decode('utf-8')
+    result = subprocess.run(cmd, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to combine blocks: {result.stderr.decode(errors='replace').strip()}")
+    return True
+
+
+def _mp3_format(path):
+    """
+    Returns (frame_rate, channels) from the first Layer III frame header of an MP3, skipping
+    a leading ID3v2 tag, or None if the file does not start with one.
+    """
+    with open(path, "rb") as f:
+        header = f.read(10)
+        if header[:3] == b"ID3":
+            tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+            f.seek(10 + tag_size + (10 if header[5] & 0x10 else 0))
+            header = f.read(4)
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return None
+    version, layer, rate_index = (header[1] >> 3) & 3, (header[1] >> 1) & 3, (header[2] >> 2) & 3
+    if version not in MP3_SAMPLE_RATES or layer != 1 or rate_index == 3:
+        return None
+    return MP3_SAMPLE_RATES[version][rate_index], 1 if header[3] >> 6 == 3 else 2
+
+
+def _silence_mp3(wait_ms, frame_rate, channels):
+    """Returns the path of a silent MP3 clip of wait_ms, encoding and caching it on first use."""
+    path = os.path.join(SILENCE_DIR, f"{wait_ms}ms_{frame_rate}_{channels}.mp3")
+    try:
+        # Bumps the mtime so the sweep, which drops clips by age, keeps the ones still in use.
+        os.utime(path)
+    except FileNotFoundError:
+        # Encoded under a unique name and renamed into place, so concurrent jobs never read a partial clip.
+        fd, tmp_path = tempfile.mkstemp(dir=SILENCE_DIR, suffix=".tmp")
+        os.close(fd)
+        result = subprocess.run([
+            AudioSegment.converter, "-y", "-v", "error", "-f", "lavfi",
+            "-i", f"anullsrc=r={frame_rate}:cl={'mono' if channels == 1 else 'stereo'}",
+            "-t", str(wait_ms / 1000), "-c:a", "libmp3lame", "-b:a", "32k", "-f", "mp3", tmp_path
+        ], capture_output=True, check=False)
+        if result.returncode != 0:
+            _safe_unlink(tmp_path)
+            raise RuntimeError(f"ffmpeg failed to encode silence: {result.stderr.decode(errors='replace').strip()}")
+        os.replace(tmp_path, path)
+    return path
+
+
+def _ffmpeg_copy_mp3(paths, waits_ms, output_path):
+    """
+    Joins MP3 blocks, each followed by its wait as a silent MP3 clip, into output_path with
+    ffmpeg's concat demuxer. The frames are copied as they are, with no decode or re-encode.
+    Every block and clip keeps its encoder delay and padding, so each join runs a few tens
+    of ms longer than with the decoding paths; it is only used when MP3_STREAM_COPY is on.
+
+    Returns False without running ffmpeg unless every block is an MP3 with the same frame
+    rate and channel count, which stream copying needs.
+    """
+    formats = {_mp3_format(path) for path in paths}
+    if len(formats) != 1 or None in formats:
+        return False
+    frame_rate, channels = formats.pop()
+
+    lines = []
+    for path, wait_ms in zip(paths, waits_ms):
+        lines.append(f"file '{os.path.abspath(path)}'")
+        if wait_ms > 0:
+            lines.append(f"file '{os.path.abspath(_silence_mp3(wait_ms, frame_rate, channels))}'")
+    list_path = f"{output_path}.concat.txt"
+    with open(list_path, "w") as f:
+        f.write("\n".join(lines))
+
+    try:
+        result = subprocess.run([
+            AudioSegment.converter, "-y", "-v", "error", "-f", "concat", "-safe", "0",
+            "-i", list_path, "-c", "copy", "-f", "mp3", output_path
+        ], capture_output=True, check=False)
+    finally:
+        _safe_unlink(list_path)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to combine blocks: {result.stderr.decode(errors='replace').strip()}")
+    return True
+
+
+def _render_block(job_id, block_index, text, provider_name, voice_id):
+    """Generates a block's audio with its provider and uploads it. Returns (file_path, upload_urls)."""
+    provider = provider_factory.get(provider_name)
+    if not provider:
+        raise ValueError(f"Provider '{provider_name}' not found in factory.")
+
+    file_path = os.path.join(TEMP_DIR, f"{job_id}_block{block_index}.{provider.preferred_format}")
+
+    provider.generate_audio(text=text, voice_id=voice_id, output_path=file_path)
+
+    upload_urls = storage_manager.upload(file_path, resource_type="raw")
+    return file_path, upload_urls
+
+
+def _record_blocks(job_id, rendered, blocks_total=None, project_id=None):
+    """
+    Records rendered blocks, given as (block_index, file_path, upload_urls) tuples, with a
+    single Redis call, fires their hooks and dispatches combine_blocks once every block is in.
+    blocks_total and project_id are read from the job hash when the task was not given them.
+    """
+    block_entries = [
+        orjson.dumps({"index": block_index, "urls": upload_urls._asdict(), "local_path": file_path})
+        for block_index, file_path, upload_urls in rendered
+    ]
+    new_done_count, total_blocks, project_id = record_blocks(
+        keys=[f"job:{job_id}:block_urls", f"job:{job_id}"],
+        args=[
+            JobStatus.PROCESSING,
+            JobStatus.FAILED,
+            "" if blocks_total is None else blocks_total,
+            project_id or "",
+            *block_entries
+        ]
+    )
+
+    for block_index, _, upload_urls in rendered:
         on_block_completed(job_id, project_id, block_index, urls=upload_urls)
 
-        total_blocks = int(redis_client.hget(f"job:{job_id}", "blocks_total"))
-        if new_done_count >= total_blocks:
-            combine_blocks.delay(job_id)
+    if new_done_count >= total_blocks:
+        combine_blocks.delay(job_id)
 
+
+def _fail_block(job_id, block_index, provider_name, e):
+    redis_client.hset(f"job:{job_id}", "status", JobStatus.FAILED)
+    error_message = f"Error processing block {block_index} for job {job_id} using provider '{provider_name}': {e}"
+    logger.error(error_message) # Keep the original log for now
+    on_block_failed(job_id, block_index, error=str(e))
+
+
+# --- Celery Tasks ---
+@celery_app.task
+def process_block(
+    job_id, block_index, text, wait_after_ms, provider_name, voice_id, blocks_total=None, project_id=None
+):
+    """
+    Delegates audio generation to the correct provider, uploads the result,
+    and updates the job status in Redis.
+    """
+    try:
+        file_path, upload_urls = _render_block(job_id, block_index, text, provider_name, voice_id)
+        _record_blocks(job_id, [(block_index, file_path, upload_urls)], blocks_total, project_id)
     except Exception as e:
-        redis_client.hset(f"job:{job_id}", "status", JobStatus.FAILED)
-        error_message = f"Error processing block {block_index} for job {job_id} using provider '{provider_name}': {e}"
-        logger.error(error_message) # Keep the original log for now
-        on_block_failed(job_id, block_index, error=str(e))
+        _fail_block(job_id, block_index, provider_name, e)
     finally:
         # The local file is intentionally not deleted here.
         # The scheduled cleanup task will handle it later.
         pass
 
 
+@celery_app.task
+def process_block_batch(job_id, blocks, blocks_total=None, project_id=None):
+    """
+    Processes several blocks of a job from a single task message. Each entry of `blocks`
+    holds process_block's block arguments, block_index through voice_id. The blocks are
+    rendered concurrently and the successful ones are then recorded together in one Redis
+    round-trip.
+    """
+    def render(block):
+        block_index, text, _, provider_name, voice_id = block
+        try:
+            return (block_index, *_render_block(job_id, block_index, text, provider_name, voice_id))
+        except Exception as e:
+            _fail_block(job_id, block_index, provider_name, e)
+            return None
+
+    with ThreadPoolExecutor(max_workers=len(blocks)) as executor:
+        rendered = [result for result in executor.map(render, blocks) if result]
+    if not rendered:
+        return
+
+    try:
+        _record_blocks(job_id, rendered, blocks_total, project_id)
+    except Exception as e:
+        providers = {block[0]: block[3] for block in blocks}
+        for block_index, _, _ in rendered:
+            _fail_block(job_id, block_index, providers[block_index], e)
+
+
 @celery_app.task
 def combine_blocks(job_id):
     """Combines audio blocks from local files and finalizes the job."""
     final_path = os.path.join(TEMP_DIR, f"{job_id}_final.mp3")
+    job_paths = [final_path]
 
     try:
-        job_data = redis_client.hgetall(f"job:{job_id}")
-        job = {k.decode('utf-8'): v.decode('utf-8') for k, v in job_data.items()}
-
-        block_info = sorted(json.loads(job["block_urls"]), key=lambda x: x['index'])
-        blocks_config = json.loads(job["blocks"])
-
-        final_audio = AudioSegment.empty()
+        # Only the two fields used here are fetched, together with the block list, in one round-trip.
+        pipe = redis_client.pipeline()
+        pipe.hmget(f"job:{job_id}", "project_id", "blocks")
+        pipe.lrange(f"job:{job_id}:block_urls", 0, -1)
+        (project_id, blocks), block_urls = pipe.execute()
 
-        for i, block_data in enumerate(block_info):
-            local_path = block_data["local_path"]
+        block_info = sorted((orjson.loads(entry) for entry in block_urls), key=lambda x: x['index'])
+        blocks_config = orjson.loads(blocks)
 
+        local_paths = [block_data["local_path"] for block_data in block_info]
+        job_paths += local_paths
+        for i, local_path in enumerate(local_paths):
             if not os.path.exists(local_path):
                 raise FileNotFoundError(f"Local file not found for block {i}: {local_path}")
 
-            audio_segment = AudioSegment.from_file(local_path)
-            final_audio += audio_segment
+        waits_ms = [blocks_config[i]["wait_after_ms"] for i in range(len(local_paths))]
+        # WAV blocks are encoded in one ffmpeg run, and MP3 blocks stream-copied if enabled;
+        # pydub handles the rest. ffmpeg writes final_path itself, so on those paths the upload
+        # reads it from disk.
+        mp3_data = None
+        if not (
+            (config.MP3_STREAM_COPY and _ffmpeg_copy_mp3(local_paths, waits_ms, final_path))
+            or _ffmpeg_encode_wavs(local_paths, waits_ms, final_path)
+        ):
+            # Each decode is an ffmpeg subprocess, so blocks decode in parallel; map keeps their order.
+            with ThreadPoolExecutor(max_workers=BLOCK_DECODE_CONCURRENCY) as executor:
+                segments = list(executor.map(_load_block_audio, local_paths))
 
-            wait_ms = blocks_config[i]["wait_after_ms"]
-            if wait_ms > 0:
-                final_audio += AudioSegment.silent(duration=wait_ms)
+            final_audio = _concatenate_segments(segments, waits_ms)
+            del segments
 
-        final_audio.export(final_path, format="mp3")
+            # Encode once into memory: the bytes are uploaded from there and written to
+            # final_path only for the local download endpoint, so the file is never re-read.
+            mp3_buffer = io.BytesIO()
+            final_audio.export(mp3_buffer, format="mp3")
+            mp3_data = mp3_buffer.getvalue()
+            with open(final_path, "wb") as f:
+                f.write(mp3_data)
 
-        upload_urls = storage_manager.upload(final_path, resource_type="raw")
-        final_url = upload_urls["primary_url"] # The primary URL is still the main result
+        upload_urls = storage_manager.upload(final_path, resource_type="raw", data=mp3_data)
+        final_url = upload_urls.primary_url # The primary URL is still the main result
 
         redis_client.hset(f"job:{job_id}", "result_url", final_url)
         redis_client.hset(f"job:{job_id}", "status", JobStatus.COMPLETED)
 
-        on_job_completed(job_id, final_urls=upload_urls)
+        on_job_completed(
+            job_id,
+            final_urls=upload_urls,
+            project_id=project_id,
+            blocks_config=blocks_config,
+            block_info=block_info
+        )
 
     except Exception as e:
         redis_client.hset(f"job:{job_id}", "status", JobStatus.FAILED)
@@ -154,5 +485,9 @@ def combine_blocks(job_id):
         logger.error(error_message) # Keep the original log for now
         on_job_failed(job_id, error=str(e))
     finally:
-        # The cleanup of individual block files is handled by the scheduled task.
-        pass
\ No newline at end of file
+        # The block and final files stay for the download endpoint until the retention period is up.
+        try:
+            expires_at = time.time() + config.TEMP_RETENTION_SECONDS
+            redis_client.zadd(TEMP_EXPIRY_KEY, dict.fromkeys(job_paths, expires_at))
+        except Exception as e:
+            logger.error("Failed to record the expiry of job %s, leaving its files to the sweep: %s", job_id, e)
\ No newline at end of file